@@ -4,7 +4,7 @@ This module contains the core functionality for performing network
 traceroutes and analyzing network paths.
 """
 
-from traceroute import Traceroute
+from traceroute import Traceroute, TracerouteSession, create_send_socket
 from exceptions import (
     TracerouteError,
     DNSResolveError,
@@ -13,6 +13,8 @@ from exceptions import (
 
 __all__ = [
     "Traceroute",
+    "TracerouteSession",
+    "create_send_socket",
     "TracerouteError",
     "DNSResolveError",
     "TraceroutePermissionError",
@@ -5,12 +5,15 @@ parses arguments, instantiates the Traceroute class and prints results.
 """
 
 import argparse
-import random
+import socket
 import sys
 from typing import Optional, Sequence, Tuple, Mapping, List
 
+import numpy as np
+
 from network_topologer import NetworkTopologer
 from exceptions import TracerouteError
+from traceroute import DEFAULT_MAX_CONSEC_TIMEOUTS, DEFAULT_MAX_TTL
 from visualization import TopologyVisualizer
 
 
@@ -26,29 +29,37 @@ def generate_random_public_ips(count: int) -> List[str]:
     Returns:
         List of random public IPv4 addresses as strings.
     """
-    public_ips = []
-    
+    rng = np.random.default_rng()
+    public_ips: List[str] = []
+
     while len(public_ips) < count:
-        # Generate random octets
-        first = random.randint(1, 223)  # Avoid 0.x.x.x, 224-255 (multicast/reserved)
-        second = random.randint(0, 255)
-        third = random.randint(0, 255)
-        fourth = random.randint(1, 254)  # Avoid .0 and .255
-        
-        ip = f"{first}.{second}.{third}.{fourth}"
-        
-        # Check if it's a private or reserved IP
-        if (
-            first == 10  # 10.0.0.0/8
-            or (first == 172 and 16 <= second <= 31)  # 172.16.0.0/12
-            or (first == 192 and second == 168)  # 192.168.0.0/16
-            or first == 127  # 127.0.0.0/8 (loopback)
-            or (first == 169 and second == 254)  # 169.254.0.0/16 (link-local)
-        ):
-            continue
-            
-        public_ips.append(ip)
-    
+        needed = count - len(public_ips)
+        # Draw a batch of candidate addresses and split them into octets
+        ints = rng.integers(0, 2**32, size=needed * 2, dtype=np.uint32)
+        first = ints >> 24
+        second = (ints >> 16) & 0xFF
+        fourth = ints & 0xFF
+
+        # Mask out private and reserved IPs in one vectorized pass
+        reserved = (
+            (first == 0)  # 0.0.0.0/8
+            | (first > 223)  # 224-255 (multicast/reserved)
+            | (first == 10)  # 10.0.0.0/8
+            | ((first == 172) & (second >= 16) & (second <= 31))  # 172.16.0.0/12
+            | ((first == 192) & (second == 168))  # 192.168.0.0/16
+            | (first == 127)  # 127.0.0.0/8 (loopback)
+            | ((first == 169) & (second == 254))  # 169.254.0.0/16 (link-local)
+            | (fourth == 0)  # Avoid .0 and .255
+            | (fourth == 255)
+        )
+        survivors = ints[~reserved][:needed]
+
+        # Only the survivors are formatted, straight from their big-endian bytes
+        packed = survivors.astype(">u4").tobytes()
+        public_ips.extend(
+            socket.inet_ntoa(packed[i : i + 4]) for i in range(0, len(packed), 4)
+        )
+
     return public_ips
 
 
@@ -94,26 +105,45 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
     parser.add_argument(
         "--parallel",
         action="store_true",
-        help="Run traceroutes in parallel using threads.",
+        help="Run traceroutes concurrently over a single shared socket.",
     )
     parser.add_argument(
         "--workers",
         type=int,
         default=None,
-        help="Maximum number of worker threads when using --parallel (default: min(len(destinations),32)).",
+        help="Maximum number of concurrent traceroutes when using --parallel (default: min(len(destinations),32)).",
     )
     parser.add_argument(
         "-t",
         "--timeout",
         type=int,
         default=2,
-        help="Timeout for each packet in seconds (default: 2).",
+        help="Seconds to wait for the replies to all of a traceroute's probes (default: 2).",
+    )
+    parser.add_argument(
+        "-m",
+        "--max-ttl",
+        type=int,
+        default=DEFAULT_MAX_TTL,
+        help=f"Maximum number of hops (TTL) to probe (default: {DEFAULT_MAX_TTL}).",
+    )
+    parser.add_argument(
+        "--max-consec-timeouts",
+        type=int,
+        default=DEFAULT_MAX_CONSEC_TIMEOUTS,
+        help=f"When a destination is not reached, show at most this many unanswered hops after the last reply (default: {DEFAULT_MAX_CONSEC_TIMEOUTS}).",
     )
     parser.add_argument(
         "--visualize",
         action="store_true",
         help="Visualize the network topology graph using matplotlib.",
     )
+    parser.add_argument(
+        "--layout",
+        choices=TopologyVisualizer.LAYOUT_ENGINES,
+        default="auto",
+        help="Graph layout engine for --visualize; 'spring' is fastest on large topologies (default: auto).",
+    )
     parser.add_argument(
         "--output",
         type=str,
@@ -123,6 +153,13 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
 
     args = parser.parse_args(argv)
 
+    if not 1 <= args.max_ttl <= 255:
+        print("Error: --max-ttl must be between 1 and 255.", file=sys.stderr)
+        sys.exit(1)
+    if args.max_consec_timeouts <= 0:
+        print("Error: --max-consec-timeouts must be a positive integer.", file=sys.stderr)
+        sys.exit(1)
+
     # Handle random IP generation or use provided destinations
     if args.random:
         if args.random <= 0:
@@ -139,24 +176,28 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
 
     port = args.port
 
-    nt = NetworkTopologer(timeout=args.timeout, port=port)
-
-    print(f"Traceroute to {destinations} (timeout: {args.timeout} seconds):")
-    try:
-        if args.parallel:
-            hops_dict = nt.run_parallel(destinations, workers=args.workers)
-        else:
-            hops_dict = nt.run(destinations)
-    except TracerouteError as e:
-        print(f"Error: {e}", file=sys.stderr)
-        sys.exit(1)
+    with NetworkTopologer(
+        timeout=args.timeout,
+        port=port,
+        max_ttl=args.max_ttl,
+        max_consec_timeouts=args.max_consec_timeouts,
+    ) as nt:
+        print(f"Traceroute to {destinations} (timeout: {args.timeout} seconds):")
+        try:
+            if args.parallel:
+                hops_dict = nt.run_parallel(destinations, workers=args.workers)
+            else:
+                hops_dict = nt.run(destinations)
+        except TracerouteError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
 
     print_hops_dict(hops_dict)
 
     # Visualize topology if requested
     if args.visualize:
-        # Build adjacency mapping from results
-        adjacency = nt.build_adjacency(hops_dict)
+        # Build adjacency mapping and mean edge latencies from results
+        adjacency, edge_means = nt.build_topology_with_mean_latency(hops_dict)
 
         if not adjacency:
             print(
@@ -165,12 +206,10 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
             )
         else:
             visualizer = TopologyVisualizer()
-            stats = visualizer.get_graph_stats(adjacency)
+            graph = visualizer.build_graph(adjacency)
+            stats = visualizer.get_graph_stats(adjacency, graph=graph)
             print(f"\nTopology stats: {stats['nodes']} nodes, {stats['edges']} edges")
 
-            # Build edge latency data
-            edge_latencies = nt.build_adjacency_with_latency(hops_dict)
-
             # Pass destination IPs for color-coding
             destination_set = set(destinations)
 
@@ -182,7 +221,9 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
                 show=show_plot,
                 title="Network Traceroute Topology",
                 destination_ips=destination_set,
-                edge_latencies=edge_latencies,
+                edge_mean_latencies=edge_means,
+                graph=graph,
+                layout_engine=args.layout,
             )
 
 
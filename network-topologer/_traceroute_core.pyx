@@ -0,0 +1,167 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled ICMP receive loop for traceroute.
+
+Optional fast path for traceroute.py: waits for and parses ICMP replies
+without holding the GIL. Build it in place (from network-topologer/) with:
+
+    cython -3 --module-name _traceroute_core _traceroute_core.pyx
+    cc -O2 -shared -fPIC $(python3-config --includes) \
+        -o _traceroute_core$(python3-config --extension-suffix) _traceroute_core.c
+
+When the extension is not built, traceroute.py uses its pure-Python loop.
+"""
+
+from libc.errno cimport errno, EAGAIN, EINTR
+from libc.math cimport ceil
+from libc.stdint cimport uint8_t, uint16_t, uint32_t
+from libc.string cimport memcpy, strerror
+from posix.time cimport clock_gettime, timespec, CLOCK_MONOTONIC
+
+
+cdef extern from "<poll.h>" nogil:
+    struct pollfd:
+        int fd
+        short events
+        short revents
+
+    int poll(pollfd *fds, unsigned long nfds, int timeout)
+    enum:
+        POLLIN
+
+
+cdef extern from "<sys/socket.h>" nogil:
+    ctypedef unsigned int socklen_t
+
+    struct sockaddr:
+        pass
+
+    ssize_t recvfrom(
+        int sockfd, void *buf, size_t len, int flags,
+        sockaddr *src_addr, socklen_t *addrlen
+    )
+    enum:
+        MSG_DONTWAIT
+
+
+cdef extern from "<netinet/in.h>" nogil:
+    struct in_addr:
+        uint32_t s_addr
+
+    struct sockaddr_in:
+        uint16_t sin_family
+        uint16_t sin_port
+        in_addr sin_addr
+
+
+cdef enum:
+    # Largest number of replies returned by one recv_until() call
+    MAX_BATCH = 256
+    BUF_SIZE = 1500
+
+
+cdef struct reply_t:
+    int icmp_type
+    uint8_t addr[4]
+    uint8_t orig_dest[4]
+    int orig_dest_port
+    double recv_time
+
+
+cdef inline double _monotonic() noexcept nogil:
+    # Same clock as Python's time.monotonic() on Linux
+    cdef timespec ts
+    clock_gettime(CLOCK_MONOTONIC, &ts)
+    return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
+cdef int _parse(const uint8_t *buf, ssize_t n, reply_t *out) noexcept nogil:
+    """Fill out from an ICMP error quoting a UDP probe; return 0 if it is not one."""
+    cdef ssize_t ihl, inner, inner_ihl
+    if n < 20:
+        return 0
+    ihl = (buf[0] & 0x0F) * 4
+    if n < ihl + 4:
+        return 0
+    # ICMP type 11 = Time Exceeded (intermediate hop), type 3 = Destination Unreachable
+    if buf[ihl] != 11 and buf[ihl] != 3:
+        return 0
+    # Outer IP header, then the 8-byte ICMP header, then the quoted IP header
+    inner = ihl + 8
+    if n < inner + 20:
+        return 0
+    inner_ihl = (buf[inner] & 0x0F) * 4
+    # The quoted UDP header follows the quoted IP header; dport is bytes 2..4
+    if n < inner + inner_ihl + 4:
+        return 0
+    out.icmp_type = buf[ihl]
+    memcpy(out.orig_dest, buf + inner + 16, 4)
+    out.orig_dest_port = (buf[inner + inner_ihl + 2] << 8) | buf[inner + inner_ihl + 3]
+    return 1
+
+
+cdef str _ntoa(const uint8_t *a):
+    return f"{a[0]}.{a[1]}.{a[2]}.{a[3]}"
+
+
+def recv_until(int fd, double timeout, int max_count):
+    """Wait up to timeout seconds for ICMP replies on the raw socket fd.
+
+    Once the socket is readable, drains every queued packet (up to max_count
+    replies) without blocking. Returns a list of
+    (icmp_type, addr, orig_dest_ip, orig_dest_port, recv_time) tuples for
+    Time Exceeded / Destination Unreachable replies quoting a UDP probe;
+    recv_time is on the time.monotonic() clock. Returns an empty list on
+    timeout. Raises OSError if poll() or recvfrom() fails before any reply
+    was parsed.
+    """
+    cdef reply_t replies[MAX_BATCH]
+    cdef uint8_t buf[BUF_SIZE]
+    cdef pollfd pfd
+    cdef sockaddr_in src
+    cdef socklen_t srclen
+    cdef ssize_t n
+    cdef int count = 0
+    cdef int err = 0
+    cdef int rc
+    cdef int timeout_ms = <int>ceil(timeout * 1000) if timeout > 0 else 0
+
+    if max_count > MAX_BATCH:
+        max_count = MAX_BATCH
+    pfd.fd = fd
+    pfd.events = POLLIN
+
+    with nogil:
+        rc = poll(&pfd, 1, timeout_ms)
+        if rc < 0:
+            err = errno
+        elif rc > 0:
+            while count < max_count:
+                srclen = sizeof(src)
+                n = recvfrom(
+                    fd, buf, BUF_SIZE, MSG_DONTWAIT, <sockaddr *>&src, &srclen
+                )
+                if n < 0:
+                    # EAGAIN == EWOULDBLOCK on Linux: the queue is drained
+                    if errno != EAGAIN:
+                        err = errno
+                    break
+                if _parse(buf, n, &replies[count]):
+                    replies[count].recv_time = _monotonic()
+                    memcpy(replies[count].addr, &src.sin_addr, 4)
+                    count += 1
+
+    # Replies already parsed win over a later recvfrom() failure; the error
+    # will show up again on the next call if it persists
+    if err and err != EINTR and count == 0:
+        raise OSError(err, strerror(err).decode())
+
+    return [
+        (
+            replies[i].icmp_type,
+            _ntoa(replies[i].addr),
+            _ntoa(replies[i].orig_dest),
+            replies[i].orig_dest_port,
+            replies[i].recv_time,
+        )
+        for i in range(count)
+    ]
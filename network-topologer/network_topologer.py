@@ -8,10 +8,20 @@ in any traceroute path.
 This is a lightweight helper useful for small-scale topology inference.
 """
 
-from typing import Sequence, List, Tuple, Optional, Dict, Set
+from typing import Sequence, List, Tuple, Optional, DefaultDict, Dict, Set
+from collections import defaultdict
+import asyncio
 import concurrent.futures
+import socket
+import struct
+import threading
 
-from traceroute import Traceroute
+from traceroute import (
+    DEFAULT_MAX_CONSEC_TIMEOUTS,
+    DEFAULT_MAX_TTL,
+    TracerouteSession,
+    create_send_socket,
+)
 from exceptions import TracerouteError
 
 
@@ -19,17 +29,110 @@ class NetworkTopologer:
     """Run many traceroutes and aggregate results into an adjacency mapping.
 
     Example:
-        mt = NetworkTopologer(timeout=2)
-        results = mt.run(['example.com', 'github.com'])
+        with NetworkTopologer(timeout=2) as mt:
+            results = mt.run(['example.com', 'github.com'])
         adj = mt.build_adjacency(results)
+        adj, latencies = mt.build_topology(results)  # both in one pass
+        adj, means = mt.build_topology_with_mean_latency(results)
+
+    Each instance owns the UDP socket its probes are sent from; close() (or
+    leaving the with block) releases it, after which no more traces can run.
+
+    Traces run on an asyncio event loop hosted by a background thread that is
+    started on first use and shared by every instance; call
+    NetworkTopologer.shutdown() to stop it.
     """
 
-    def __init__(self, timeout: int = 2, port: int = 33434):
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _loop_thread: Optional[threading.Thread] = None
+    # Set as the loop's default executor so shutdown() can stop its DNS threads
+    _executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+    _loop_lock = threading.Lock()
+
+    def __init__(
+        self,
+        timeout: int = 2,
+        port: int = 33434,
+        max_ttl: int = DEFAULT_MAX_TTL,
+        max_consec_timeouts: int = DEFAULT_MAX_CONSEC_TIMEOUTS,
+    ):
         self.timeout = timeout
         self.port = port
+        self.max_ttl = max_ttl
+        self.max_consec_timeouts = max_consec_timeouts
+        # one UDP socket sends the probes of every trace this instance runs
+        self._send_sock = create_send_socket()
         # store raw traceroute results: destination -> list of (ttl, ip_or_None, rtt_ms)
         self.results: Dict[str, List[Tuple[int, Optional[str], Optional[float]]]] = {}
 
+    def __enter__(self) -> "NetworkTopologer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the shared send socket; the instance cannot run traces afterwards."""
+        self._send_sock.close()
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop the shared event loop and its thread.
+
+        Runs still in progress are cancelled and their sockets closed; their
+        callers get a TracerouteError. A later run() or run_parallel() starts
+        a fresh loop.
+        """
+        with cls._loop_lock:
+            loop, thread, executor = cls._loop, cls._loop_thread, cls._executor
+            cls._loop = cls._loop_thread = cls._executor = None
+        if loop is None or thread is None or executor is None:
+            return
+        # Every run was submitted under _loop_lock, so all of them are queued
+        # on the loop ahead of this and get cancelled here
+        asyncio.run_coroutine_threadsafe(_cancel_all_tasks(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        executor.shutdown(wait=True)
+        loop.close()
+
+    def _run_on_loop(
+        self, destinations: Sequence[str], limit: int
+    ) -> List[List[Tuple[int, Optional[str], Optional[float]]]]:
+        """Run _trace_all() on the shared loop and wait for its result.
+
+        Raises TracerouteError if the instance is closed or shutdown() cancels
+        the run.
+        """
+        # A closed socket would fail every send, and each trace would then
+        # silently come back as an empty path
+        if self._send_sock.fileno() == -1:
+            raise TracerouteError("NetworkTopologer is closed")
+        cls = type(self)
+        # Submit under the lock so shutdown() cannot stop the loop in between,
+        # which would leave the coroutine queued on a dead loop forever
+        with cls._loop_lock:
+            if cls._loop is None:
+                loop = asyncio.new_event_loop()
+                executor = concurrent.futures.ThreadPoolExecutor(
+                    thread_name_prefix="network-topologer-dns"
+                )
+                loop.set_default_executor(executor)
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="network-topologer-loop",
+                    daemon=True,
+                )
+                thread.start()
+                cls._loop, cls._loop_thread, cls._executor = loop, thread, executor
+            future = asyncio.run_coroutine_threadsafe(
+                self._trace_all(destinations, limit=limit), cls._loop
+            )
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise TracerouteError("Traceroute run cancelled by shutdown()") from None
+
     def run(
         self, destinations: Sequence[str]
     ) -> Dict[str, List[Tuple[int, Optional[str], Optional[float]]]]:
@@ -38,16 +141,12 @@ class NetworkTopologer:
         Returns a mapping destination -> hops list. On traceroute errors the
         destination maps to an empty list and the error is recorded in results
         as an empty list (caller can check logs or exceptions if needed).
+        Raises TraceroutePermissionError if the shared raw socket cannot be opened,
+        and TracerouteError if the instance is closed.
         """
-        for dest in destinations:
-            tracer = Traceroute(timeout=self.timeout, port=self.port)
-            try:
-                hops = tracer.run(dest)
-            except TracerouteError:
-                # store empty result on error to indicate failure
-                self.results[dest] = []
-            else:
-                self.results[dest] = hops
+        hops_lists = self._run_on_loop(destinations, limit=1)
+        for dest, hops in zip(destinations, hops_lists):
+            self.results[dest] = hops
 
         return self.results
 
@@ -56,54 +155,123 @@ class NetworkTopologer:
     ) -> Dict[str, List[Tuple[int, Optional[str], Optional[float]]]]:
         """Run traceroutes concurrently for the provided destinations.
 
-        `workers` controls the maximum number of threads; if None, uses min(len(destinations), 32).
+        All traces run as coroutines on one event loop over a single
+        TracerouteSession, so no thread is spent per destination.
+        `workers` controls the maximum number of concurrent traces; if None, uses min(len(destinations), 32).
+        self.results keeps its previous contents until all traces are done.
+        Raises TracerouteError if the instance is closed.
         """
-        self.results = {}
-        max_workers = workers or (min(len(destinations), 32) if destinations else 1)
-
-        def _worker(
-            dest: str,
-        ) -> Tuple[str, List[Tuple[int, Optional[str], Optional[float]]]]:
-            tracer = Traceroute(timeout=self.timeout, port=self.port)
-            try:
-                hops = tracer.run(dest)
-            except TracerouteError:
-                return dest, []
-            return dest, hops
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
-            futures = {ex.submit(_worker, d): d for d in destinations}
-            for fut in concurrent.futures.as_completed(futures):
-                dest, hops = fut.result()
-                self.results[dest] = hops
+        limit = workers or (min(len(destinations), 32) if destinations else 1)
+
+        hops_lists = self._run_on_loop(destinations, limit=limit)
+        # One assignment, so concurrent readers never see a partial mapping
+        self.results = dict(zip(destinations, hops_lists))
 
         return self.results
 
-    def build_adjacency(
+    async def _trace_all(
+        self, destinations: Sequence[str], limit: int
+    ) -> List[List[Tuple[int, Optional[str], Optional[float]]]]:
+        """Trace destinations over one session, at most `limit` at a time.
+
+        Returns one hops list per destination, in the order given; traces
+        start in that order too. Failed traces yield an empty list.
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async with TracerouteSession(
+            timeout=self.timeout,
+            port=self.port,
+            max_ttl=self.max_ttl,
+            max_consec_timeouts=self.max_consec_timeouts,
+            send_sock=self._send_sock,
+        ) as session:
+
+            async def _trace_one(
+                dest: str,
+            ) -> List[Tuple[int, Optional[str], Optional[float]]]:
+                async with semaphore:
+                    try:
+                        return await session.trace(dest)
+                    except TracerouteError:
+                        return []
+
+            return await asyncio.gather(*(_trace_one(d) for d in destinations))
+
+    def build_topology(
         self,
         results: Optional[
             Dict[str, List[Tuple[int, Optional[str], Optional[float]]]]
         ] = None,
-    ) -> Dict[str, Set[str]]:
-        """Build adjacency dict from traceroute results.
+    ) -> Tuple[Dict[str, Set[str]], Dict[Tuple[str, str], List[float]]]:
+        """Build the adjacency and edge latency mappings in a single pass.
 
-        Each edge is added between consecutive observed hop IPs (ignoring None).
-        Returns a dict: ip -> set(next_hop_ips).
+        Returns (adjacency, edge_latencies) as described in build_adjacency()
+        and build_adjacency_with_latency().
         """
         if results is None:
             results = self.results
 
-        adjacency: Dict[str, Set[str]] = {}
+        # defaultdict only calls the factory on a miss, unlike setdefault()
+        adjacency: DefaultDict[str, Set[str]] = defaultdict(set)
+        edge_latencies: DefaultDict[Tuple[str, str], List[float]] = defaultdict(list)
+
+        for hops in results.values():
+            # Previous observed hop, and previous hop that also has an RTT
+            prev_ip: Optional[str] = None
+            prev_timed_ip: Optional[str] = None
+            prev_rtt: Optional[float] = None
+            for _, ip, rtt in hops:
+                # Skip None timeouts
+                if ip is None:
+                    continue
+                if prev_ip is not None:
+                    adjacency[prev_ip].add(ip)
+                prev_ip = ip
+
+                if rtt is None:
+                    continue
+                if prev_timed_ip is not None:
+                    # Calculate delta latency between hops
+                    delta_ms = rtt - prev_rtt if (rtt and prev_rtt) else rtt
+                    if delta_ms and delta_ms > 0:
+                        edge_latencies[(prev_timed_ip, ip)].append(delta_ms)
+                prev_timed_ip, prev_rtt = ip, rtt
+
+        return dict(adjacency), dict(edge_latencies)
+
+    def build_topology_with_mean_latency(
+        self,
+        results: Optional[
+            Dict[str, List[Tuple[int, Optional[str], Optional[float]]]]
+        ] = None,
+    ) -> Tuple[Dict[str, Set[str]], Dict[Tuple[str, str], float]]:
+        """Like build_topology(), but average each edge's measurements up front.
 
-        for _, hops in results.items():
-            # Extract sequence of IPs, skipping None timeouts
-            ips = [ip for _, ip, _ in hops if ip is not None]
-            for i in range(len(ips) - 1):
-                a = ips[i]
-                b = ips[i + 1]
-                adjacency.setdefault(a, set()).add(b)
+        Returns (adjacency, edge_means) where edge_means maps
+        (src_ip, dst_ip) -> mean RTT delta in ms, ready for
+        TopologyVisualizer.plot_topology(edge_mean_latencies=...).
+        """
+        adjacency, edge_latencies = self.build_topology(results)
+        # build_topology() only creates an edge's list with its first sample
+        edge_means = {
+            edge: sum(latencies) / len(latencies)
+            for edge, latencies in edge_latencies.items()
+        }
+        return adjacency, edge_means
 
-        return adjacency
+    def build_adjacency(
+        self,
+        results: Optional[
+            Dict[str, List[Tuple[int, Optional[str], Optional[float]]]]
+        ] = None,
+    ) -> Dict[str, Set[str]]:
+        """Build adjacency dict from traceroute results.
+
+        Each edge is added between consecutive observed hop IPs (ignoring None).
+        Returns a dict: ip -> set(next_hop_ips).
+        """
+        return self.build_topology(results)[0]
 
     def build_adjacency_with_latency(
         self,
@@ -116,35 +284,35 @@ class NetworkTopologer:
         Returns dict: (src_ip, dst_ip) -> list of RTT measurements in ms.
         Multiple measurements may exist if the same edge appears in multiple traceroutes.
         """
-        if results is None:
-            results = self.results
-
-        edge_latencies: Dict[Tuple[str, str], List[float]] = {}
-
-        for _, hops in results.items():
-            # Build list of (ip, rtt_ms) tuples, skipping None IPs
-            ip_rtt_pairs = [
-                (ip, rtt) for _, ip, rtt in hops if ip is not None and rtt is not None
-            ]
-
-            for i in range(len(ip_rtt_pairs) - 1):
-                src_ip, src_rtt = ip_rtt_pairs[i]
-                dst_ip, dst_rtt = ip_rtt_pairs[i + 1]
-
-                # Calculate delta latency between hops
-                delta_ms = dst_rtt - src_rtt if (dst_rtt and src_rtt) else dst_rtt
-                if delta_ms and delta_ms > 0:
-                    edge = (src_ip, dst_ip)
-                    edge_latencies.setdefault(edge, []).append(delta_ms)
-
-        return edge_latencies
+        return self.build_topology(results)[1]
 
     def topology_dict(
         self,
         results: Optional[
             Dict[str, List[Tuple[int, Optional[str], Optional[float]]]]
         ] = None,
+        sort: bool = False,
     ) -> Dict[str, List[str]]:
-        """Return adjacency mapping with lists instead of sets for JSON-compatibility."""
+        """Return adjacency mapping with lists instead of sets for JSON-compatibility.
+
+        With sort=True each next-hop list is ordered numerically by IPv4
+        address (so 9.x sorts before 10.x); otherwise the order is arbitrary.
+        """
         adj = self.build_adjacency(results)
-        return {k: sorted(list(v)) for k, v in adj.items()}
+        if not sort:
+            return {k: list(v) for k, v in adj.items()}
+        return {k: sorted(v, key=_ip_sort_key) for k, v in adj.items()}
+
+
+async def _cancel_all_tasks() -> None:
+    """Cancel every other task on the running loop and wait for them to unwind."""
+    current = asyncio.current_task()
+    tasks = [task for task in asyncio.all_tasks() if task is not current]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _ip_sort_key(ip: str) -> int:
+    """Return the IPv4 address as an integer for numeric ordering."""
+    return struct.unpack("!I", socket.inet_aton(ip))[0]
@@ -4,11 +4,18 @@ This implementation sends UDP probes with increasing TTL and listens
 for ICMP responses using a raw socket. It does not depend on scapy.
 """
 
-from typing import List, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional
+from collections import OrderedDict
+import asyncio
+import contextlib
+import ctypes
+import os
 import socket
 import struct
 import time
-import select
+import selectors
+import sys
+import threading
 
 from exceptions import (
     TracerouteError,
@@ -16,30 +23,226 @@ from exceptions import (
     TraceroutePermissionError,
 )
 
+try:
+    import _traceroute_core
+except ImportError:
+    # Compiled receive loop not built; use the pure-Python one
+    _traceroute_core = None
+
+# Default number of probes (TTLs 1..max_ttl) sent per trace, like traceroute(8) -m
+DEFAULT_MAX_TTL = 30
+
+# Default number of trailing unanswered TTLs kept when a trace misses its destination
+DEFAULT_MAX_CONSEC_TIMEOUTS = 5
+
+# Destination port block reserved for each trace running in a TracerouteSession
+_PORT_STRIDE = 64
+
+# Minimum IPv4 header length, and a precompiled big-endian 16-bit port field
+_IP_HDR_MIN = 20
+_PORT = struct.Struct("!H")
+
+# A parsed probe reply: (icmp_type, addr, orig_dest_ip, orig_dest_port, recv_time)
+_ProbeReply = Tuple[int, str, str, int, float]
+
+# Seconds a resolved hostname stays in the DNS cache, and the cache's maximum size
+DNS_CACHE_TTL = 300.0
+DNS_CACHE_SIZE = 1024
+
+# hostname -> (ip, expiry time.monotonic()), least recently used first
+_DNS_CACHE: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_DNS_CACHE_LOCK = threading.Lock()
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _SockaddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _CmsgTTL(ctypes.Structure):
+    """A cmsghdr carrying one int of IP_TTL data; sizeof() == CMSG_SPACE(4)."""
+
+    _fields_ = [
+        ("cmsg_len", ctypes.c_size_t),
+        ("cmsg_level", ctypes.c_int),
+        ("cmsg_type", ctypes.c_int),
+        ("ttl", ctypes.c_int),
+    ]
+
+
+def _load_sendmmsg():
+    """Return glibc's sendmmsg() via ctypes, or None where it is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(_MMsgHdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+    ]
+    func.restype = ctypes.c_int
+    return func
+
+
+_libc_sendmmsg = _load_sendmmsg()
+
+
+def _sendmmsg_probes(
+    fd: int, dest_ip: str, base_port: int, ttls: Sequence[int]
+) -> None:
+    """Send an empty UDP datagram to dest_ip:base_port+ttl for each ttl in one syscall.
+
+    Raises TracerouteError on send failures.
+    """
+    count = len(ttls)
+    addrs = (_SockaddrIn * count)()
+    cmsgs = (_CmsgTTL * count)()
+    msgs = (_MMsgHdr * count)()
+    packed_ip = socket.inet_aton(dest_ip)
+    for i, ttl in enumerate(ttls):
+        addr = addrs[i]
+        addr.sin_family = socket.AF_INET
+        addr.sin_port = socket.htons(base_port + ttl)
+        ctypes.memmove(addr.sin_addr, packed_ip, 4)
+        cmsg = cmsgs[i]
+        cmsg.cmsg_len = socket.CMSG_LEN(4)
+        cmsg.cmsg_level = socket.IPPROTO_IP
+        cmsg.cmsg_type = socket.IP_TTL
+        cmsg.ttl = ttl
+        hdr = msgs[i].msg_hdr
+        hdr.msg_name = ctypes.addressof(addr)
+        hdr.msg_namelen = ctypes.sizeof(_SockaddrIn)
+        hdr.msg_control = ctypes.addressof(cmsg)
+        hdr.msg_controllen = ctypes.sizeof(_CmsgTTL)
+
+    sent = 0
+    while sent < count:
+        n = _libc_sendmmsg(fd, ctypes.byref(msgs[sent]), count - sent, 0)
+        if n < 0:
+            err = ctypes.get_errno()
+            raise TracerouteError(
+                f"Failed to send probe at ttl={ttls[sent]}: {os.strerror(err)}"
+            )
+        sent += n
+
+
+def create_send_socket() -> socket.socket:
+    """Create a UDP socket suitable for sending probes to any destination.
+
+    Probes carry their TTL as ancillary data, so one socket can be shared by
+    any number of Traceroute instances and concurrent traces.
+    """
+    send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    # Bind to an ephemeral port to ensure we receive replies related to our probes
+    send_sock.bind(("", 0))
+    return send_sock
+
 
 class Traceroute:
     """Run traceroute to a destination using UDP probes and ICMP replies.
 
     The run() method returns a list of (ttl, ip_or_None, rtt_ms) tuples where
     ip_or_None is None for timeouts and rtt_ms is the round-trip time in milliseconds.
+    Probes for every TTL up to max_ttl are sent in one burst and replies are
+    matched back to their TTL by the per-probe destination port, so a whole
+    trace waits for at most one timeout. When the destination is not reached,
+    the path ends after at most max_consec_timeouts trailing unanswered TTLs.
+    Pass send_sock (see create_send_socket()) to reuse one UDP socket across
+    instances; it is then never closed by the Traceroute.
     """
 
-    def __init__(self, timeout: int = 2, port: int = 33434):
+    def __init__(
+        self,
+        timeout: int = 2,
+        port: int = 33434,
+        max_ttl: int = DEFAULT_MAX_TTL,
+        max_consec_timeouts: int = DEFAULT_MAX_CONSEC_TIMEOUTS,
+        send_sock: Optional[socket.socket] = None,
+    ):
         self.timeout = float(timeout)
         self.port = int(port)
+        self.max_ttl = int(max_ttl)
+        self.max_consec_timeouts = int(max_consec_timeouts)
+        self._shared_send_sock = send_sock
+
+    def _lookup_cached(self, destination: str) -> Optional[str]:
+        """Return destination's IPv4 address if it is known without a DNS query.
+
+        Dotted-quad literals are returned as-is; hostnames are looked up in the
+        process-wide DNS cache. Returns None on a cache miss.
+        """
+        try:
+            socket.inet_pton(socket.AF_INET, destination)
+        except OSError:
+            pass
+        else:
+            return destination
+
+        with _DNS_CACHE_LOCK:
+            cached = _DNS_CACHE.get(destination)
+            if cached is not None and cached[1] > time.monotonic():
+                _DNS_CACHE.move_to_end(destination)
+                return cached[0]
+        return None
 
     def _resolve(self, destination: str) -> str:
+        """Resolve destination to an IPv4 address, using the process-wide DNS cache.
+
+        Dotted-quad literals are returned as-is without touching DNS.
+        """
+        ip = self._lookup_cached(destination)
+        if ip is not None:
+            return ip
+
         try:
-            return socket.gethostbyname(destination)
+            ip = socket.gethostbyname(destination)
         except socket.gaierror as e:
             raise DNSResolveError(
                 f"Failed to resolve destination '{destination}': {e}"
             ) from e
 
+        with _DNS_CACHE_LOCK:
+            _DNS_CACHE[destination] = (ip, time.monotonic() + DNS_CACHE_TTL)
+            _DNS_CACHE.move_to_end(destination)
+            if len(_DNS_CACHE) > DNS_CACHE_SIZE:
+                _DNS_CACHE.popitem(last=False)
+        return ip
+
     def _create_sockets(self) -> Tuple[socket.socket, socket.socket]:
         """Create the send (UDP) and recv (RAW ICMP) sockets.
 
-        Raises TraceroutePermissionError if raw socket creation is denied.
+        The shared send socket is returned instead of a new one if the
+        Traceroute was given one. Raises TraceroutePermissionError if raw
+        socket creation is denied.
         """
         try:
             recv_sock = socket.socket(
@@ -52,109 +255,378 @@ class Traceroute:
                 "Permission denied when creating raw socket. Try running as root or with sudo."
             ) from e
 
-        send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        # Bind to an ephemeral port to ensure we receive replies related to our probes
-        send_sock.bind(("", 0))
+        send_sock = self._shared_send_sock or create_send_socket()
 
         return send_sock, recv_sock
 
     def _parse_icmp_type(self, data: bytes) -> Optional[int]:
         """Parse an IP packet and return the ICMP type, or None if parsing fails."""
-        if len(data) < 20:
+        if len(data) < _IP_HDR_MIN:
+            return None
+        # IP header: first byte contains version and IHL; the ICMP type is
+        # the first byte after it
+        ihl = (data[0] & 0x0F) << 2
+        return data[ihl] if len(data) > ihl else None
+
+    def _parse_probe_reply(self, data: bytes) -> Optional[Tuple[int, str, int]]:
+        """Parse an ICMP error quoting one of our probes.
+
+        Returns (icmp_type, orig_dest_ip, orig_dest_port) taken from the
+        original IP and UDP headers embedded in the ICMP payload, or None if
+        the packet is not a Time Exceeded / Destination Unreachable reply.
+        """
+        icmp_type = self._parse_icmp_type(data)
+        # ICMP type 11 = Time Exceeded (intermediate hop), type 3 = Destination Unreachable
+        if icmp_type not in (11, 3):
             return None
-        # IP header: first byte contains version and IHL
-        ver_ihl = data[0]
-        ihl = (ver_ihl & 0x0F) * 4
-        if len(data) < ihl + 4:
+        # Outer IP header, then the 8-byte ICMP header, then the quoted IP header
+        inner = ((data[0] & 0x0F) << 2) + 8
+        if len(data) < inner + _IP_HDR_MIN:
             return None
-        icmp_header = data[ihl : ihl + 4]
-        icmp_type, _, _ = struct.unpack("!BBH", icmp_header)
-        return icmp_type
+        inner_ihl = (data[inner] & 0x0F) << 2
+        # The quoted UDP header follows the quoted IP header; dport is bytes 2..4
+        if len(data) < inner + inner_ihl + 4:
+            return None
+        orig_dest_ip = socket.inet_ntoa(data[inner + 16 : inner + 20])
+        (orig_dest_port,) = _PORT.unpack_from(data, inner + inner_ihl + 2)
+        return icmp_type, orig_dest_ip, orig_dest_port
 
-    def _send_probe(
-        self, send_sock: socket.socket, dest_ip: str, dest_port: int, ttl: int
-    ) -> None:
-        """Send a single UDP probe to dest_ip:dest_port with given TTL.
+    def _send_probes(
+        self, send_sock: socket.socket, dest_ip: str, base_port: int
+    ) -> Dict[int, float]:
+        """Send one UDP probe per TTL in 1..max_ttl back-to-back.
 
+        Each probe goes to base_port + ttl so replies can be matched to their
+        TTL, and carries its TTL as IP_TTL ancillary data so no setsockopt is
+        needed. On Linux the whole burst is handed to the kernel with a single
+        sendmmsg() call. Returns a mapping ttl -> send time (time.monotonic()).
         Raises TracerouteError on send failures.
         """
-        # set TTL on the sending UDP socket
-        send_sock.setsockopt(socket.SOL_IP, socket.IP_TTL, ttl)
-        try:
-            send_sock.sendto(b"", (dest_ip, dest_port))
-        except OSError as e:
-            raise TracerouteError(f"Failed to send probe at ttl={ttl}: {e}") from e
+        ttls = range(1, self.max_ttl + 1)
+        if _libc_sendmmsg is not None:
+            now = time.monotonic()
+            _sendmmsg_probes(send_sock.fileno(), dest_ip, base_port, ttls)
+            return dict.fromkeys(ttls, now)
 
-    def _receive_reply(
-        self, recv_sock: socket.socket, timeout: float
-    ) -> Tuple[Optional[str], Optional[int], Optional[float]]:
-        """Wait for a single ICMP reply until timeout and return (addr, icmp_type, rtt_ms).
+        send_times: Dict[int, float] = {}
+        for ttl in ttls:
+            send_times[ttl] = time.monotonic()
+            try:
+                send_sock.sendmsg(
+                    [],
+                    [(socket.IPPROTO_IP, socket.IP_TTL, struct.pack("i", ttl))],
+                    0,
+                    (dest_ip, base_port + ttl),
+                )
+            except OSError as e:
+                raise TracerouteError(f"Failed to send probe at ttl={ttl}: {e}") from e
+        return send_times
+
+    def _receive_replies(
+        self,
+        sel: Optional[selectors.BaseSelector],
+        recv_sock: socket.socket,
+        window: "_ProbeWindow",
+    ) -> None:
+        """Collect ICMP replies for all in-flight probes of window until timeout.
 
-        Returns (None, None, None) on timeout or parsing failure.
-        rtt_ms is the round-trip time in milliseconds.
+        sel must have recv_sock registered for reading; it is unused (and may be
+        None) when the compiled _traceroute_core is built. Stops early once
+        window reports the trace complete.
         """
-        start = time.time()
-        addr: Optional[str] = None
-        icmp_type: Optional[int] = None
-        rtt_ms: Optional[float] = None
+        deadline = time.monotonic() + self.timeout
         while True:
-            time_left = timeout - (time.time() - start)
+            time_left = deadline - time.monotonic()
             if time_left <= 0:
                 break
-            r, _, _ = select.select([recv_sock], [], [], time_left)
-            if not r:
-                break
+            replies = self._wait_replies(sel, recv_sock, time_left)
+            for icmp_type, addr, orig_dest_ip, orig_dest_port, recv_time in replies:
+                if orig_dest_ip != window.dest_ip:
+                    continue
+                ttl = orig_dest_port - window.base_port
+                if window.record(ttl, addr, icmp_type, recv_time):
+                    return
+
+    def _wait_replies(
+        self,
+        sel: Optional[selectors.BaseSelector],
+        recv_sock: socket.socket,
+        timeout: float,
+    ) -> List[_ProbeReply]:
+        """Wait up to timeout for ICMP packets and return the probe replies among them.
+
+        Uses the compiled _traceroute_core when it is built, which polls,
+        receives and parses the whole batch without holding the GIL.
+        Returns an empty list on timeout or socket errors.
+        """
+        if _traceroute_core is not None:
             try:
-                data, curr_addr = recv_sock.recvfrom(1024)
-                recv_time = time.time()
-            except socket.error:
-                break
+                return _traceroute_core.recv_until(
+                    recv_sock.fileno(), timeout, self.max_ttl
+                )
+            except OSError:
+                return []
 
-            addr = curr_addr[0]
-            rtt_ms = (recv_time - start) * 1000  # Convert to milliseconds
-            icmp_type = self._parse_icmp_type(data)
-            # ICMP type 11 = Time Exceeded (intermediate hop), type 3 = Destination Unreachable
-            if icmp_type in (11, 3):
-                break
+        assert sel is not None
+        if not sel.select(timeout):
+            return []
+        try:
+            data, curr_addr = recv_sock.recvfrom(1500)
+            recv_time = time.monotonic()
+        except socket.error:
+            return []
 
-        return addr, icmp_type, rtt_ms
+        parsed = self._parse_probe_reply(data)
+        if parsed is None:
+            return []
+        icmp_type, orig_dest_ip, orig_dest_port = parsed
+        return [(icmp_type, curr_addr[0], orig_dest_ip, orig_dest_port, recv_time)]
 
     def run(self, destination: str) -> List[Tuple[int, Optional[str], Optional[float]]]:
         dest_ip = self._resolve(destination)
+        window = self._new_window(dest_ip, self.port)
+
+        with contextlib.ExitStack() as stack:
+            send_sock, recv_sock = self._create_sockets()
+            stack.callback(recv_sock.close)
+            if send_sock is not self._shared_send_sock:
+                stack.callback(send_sock.close)
+            sel: Optional[selectors.BaseSelector] = None
+            if _traceroute_core is None:
+                # The compiled receive loop polls the socket itself
+                sel = stack.enter_context(selectors.DefaultSelector())
+                sel.register(recv_sock, selectors.EVENT_READ)
+
+            # Send the whole TTL window up front so a trace costs one timeout,
+            # not one per hop
+            window.send_times = self._send_probes(send_sock, dest_ip, self.port)
+            self._receive_replies(sel, recv_sock, window)
+
+        return window.hops()
+
+    def _new_window(self, dest_ip: str, base_port: int) -> "_ProbeWindow":
+        return _ProbeWindow(
+            dest_ip, base_port, self.max_ttl, self.max_consec_timeouts
+        )
+
+
+class _ProbeWindow:
+    """Replies collected for one burst of probes towards a destination."""
+
+    def __init__(
+        self, dest_ip: str, base_port: int, max_ttl: int, max_consec_timeouts: int
+    ):
+        self.dest_ip = dest_ip
+        self.base_port = base_port
+        self.max_ttl = max_ttl
+        self.max_consec_timeouts = max_consec_timeouts
+        # ttl -> send time (time.monotonic()) of the probe
+        self.send_times: Dict[int, float] = {}
+        # ttl -> (addr, rtt_ms)
+        self.replies: Dict[int, Tuple[str, float]] = {}
+        # lowest TTL whose probe reached the destination
+        self.dest_ttl: Optional[int] = None
+        # resolved by TracerouteSession once the trace is complete
+        self.done: Optional["asyncio.Future[None]"] = None
+
+    def record(self, ttl: int, addr: str, icmp_type: int, recv_time: float) -> bool:
+        """Record the reply to the probe sent with ttl.
+
+        Returns True once every TTL up to the destination (or max_ttl) has a reply.
+        """
+        if ttl not in self.send_times or ttl in self.replies:
+            return False
+
+        self.replies[ttl] = (addr, (recv_time - self.send_times[ttl]) * 1000)
+        # If the reply came from the destination (or ICMP dest unreachable),
+        # no probe with a higher TTL can tell us anything new
+        if addr == self.dest_ip or icmp_type == 3:
+            if self.dest_ttl is None or ttl < self.dest_ttl:
+                self.dest_ttl = ttl
+
+        last_ttl = self.dest_ttl or self.max_ttl
+        return all(t in self.replies for t in range(1, last_ttl + 1))
+
+    def hops(self) -> List[Tuple[int, Optional[str], Optional[float]]]:
+        """Return (ttl, ip_or_None, rtt_ms) tuples up to the destination hop.
+
+        If the destination was not reached, the path ends at most
+        max_consec_timeouts unanswered TTLs after the last answered one; every
+        reply received is kept, however long the gaps before it.
+        """
+        last_ttl = self.dest_ttl
+        if last_ttl is None:
+            last_answered = max(self.replies, default=0)
+            last_ttl = min(last_answered + self.max_consec_timeouts, self.max_ttl)
+
         hops: List[Tuple[int, Optional[str], Optional[float]]] = []
+        for ttl in range(1, last_ttl + 1):
+            if ttl in self.replies:
+                addr, rtt_ms = self.replies[ttl]
+                hops.append((ttl, addr, rtt_ms))
+            else:
+                hops.append((ttl, None, None))
+        return hops
 
-        send_sock, recv_sock = self._create_sockets()
-        try:
-            base_port = self.port
-            ttl = 1
-            while True:
-                # Use a per-ttl destination port to match responses
-                dest_port = base_port + ttl
 
-                # send probe
-                self._send_probe(send_sock, dest_ip, dest_port, ttl)
+class TracerouteSession(Traceroute):
+    """Multiplex traceroutes to many destinations over one pair of sockets.
 
-                # receive reply
-                addr, icmp_type, rtt_ms = self._receive_reply(recv_sock, self.timeout)
+    The session runs on an asyncio event loop: open() (or entering the async
+    context manager) creates the sockets once and registers the raw ICMP
+    socket with the loop, whose reader callback routes each reply to its
+    in-flight trace by the original destination IP and port quoted in the
+    payload. Any number of trace() coroutines may run concurrently; each
+    trace gets its own block of destination ports.
 
-                if addr is None:
-                    hops.append((ttl, None, None))
-                else:
-                    hops.append((ttl, addr, rtt_ms))
-                    # If the reply came from the destination (or ICMP dest unreachable), stop
-                    if addr == dest_ip or (icmp_type is not None and icmp_type == 3):
-                        break
+    Example:
+        async with TracerouteSession(timeout=2) as session:
+            hops = await session.trace('example.com')
+    """
 
-                ttl += 1
+    def __init__(
+        self,
+        timeout: int = 2,
+        port: int = 33434,
+        max_ttl: int = DEFAULT_MAX_TTL,
+        max_consec_timeouts: int = DEFAULT_MAX_CONSEC_TIMEOUTS,
+        send_sock: Optional[socket.socket] = None,
+    ):
+        super().__init__(
+            timeout=timeout,
+            port=port,
+            max_ttl=max_ttl,
+            max_consec_timeouts=max_consec_timeouts,
+            send_sock=send_sock,
+        )
+        self._send_sock: Optional[socket.socket] = None
+        self._recv_sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (orig_dest_ip, orig_dest_port) -> (window, ttl)
+        self._pending: Dict[Tuple[str, int], Tuple[_ProbeWindow, int]] = {}
+        self._next_slot = 0
 
-        finally:
+    async def __aenter__(self) -> "TracerouteSession":
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """Create the shared sockets and register them with the running loop.
+
+        Must be called from a coroutine. Raises TraceroutePermissionError if
+        raw socket creation is denied.
+        """
+        if self._recv_sock is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._send_sock, self._recv_sock = self._create_sockets()
+        # The loop only calls us back when data is queued; never block it
+        self._recv_sock.setblocking(False)
+        self._loop.add_reader(self._recv_sock.fileno(), self._on_readable)
+
+    def close(self) -> None:
+        """Unregister from the loop and close the session's sockets.
+
+        A send socket passed to the constructor is left open.
+        """
+        if self._recv_sock is None:
+            return
+        assert self._loop is not None and self._send_sock is not None
+        self._loop.remove_reader(self._recv_sock.fileno())
+        if self._send_sock is not self._shared_send_sock:
+            self._send_sock.close()
+        self._recv_sock.close()
+        self._send_sock = self._recv_sock = None
+        self._loop = None
+
+    def _on_readable(self) -> None:
+        """Drain every queued ICMP packet and dispatch it."""
+        assert self._recv_sock is not None
+        if _traceroute_core is not None:
             try:
-                send_sock.close()
-            except Exception:
-                pass
+                # Non-blocking: the loop only calls us once data is queued
+                replies = _traceroute_core.recv_until(
+                    self._recv_sock.fileno(), 0.0, 256
+                )
+            except OSError:
+                return
+            for reply in replies:
+                self._dispatch(*reply)
+            return
+
+        while True:
             try:
-                recv_sock.close()
-            except Exception:
-                pass
+                data, curr_addr = self._recv_sock.recvfrom(1500)
+                recv_time = time.monotonic()
+            except socket.error:
+                return
+            parsed = self._parse_probe_reply(data)
+            if parsed is not None:
+                icmp_type, orig_dest_ip, orig_dest_port = parsed
+                self._dispatch(
+                    icmp_type, curr_addr[0], orig_dest_ip, orig_dest_port, recv_time
+                )
 
-        return hops
+    def _dispatch(
+        self,
+        icmp_type: int,
+        addr: str,
+        orig_dest_ip: str,
+        orig_dest_port: int,
+        recv_time: float,
+    ) -> None:
+        """Route one probe reply to the trace that sent the quoted probe."""
+        entry = self._pending.get((orig_dest_ip, orig_dest_port))
+        if entry is None:
+            return
+        window, ttl = entry
+        if window.record(ttl, addr, icmp_type, recv_time):
+            assert window.done is not None
+            if not window.done.done():
+                window.done.set_result(None)
+
+    def _allocate_base_port(self) -> int:
+        # Disjoint port blocks let concurrent traces to the same destination coexist
+        stride = max(_PORT_STRIDE, self.max_ttl)
+        slots = max(1, (65535 - self.max_ttl - self.port) // stride)
+        base_port = self.port + (self._next_slot % slots) * stride
+        self._next_slot += 1
+        return base_port
+
+    async def trace(
+        self, destination: str
+    ) -> List[Tuple[int, Optional[str], Optional[float]]]:
+        """Trace destination over the session sockets.
+
+        Returns the same list of (ttl, ip_or_None, rtt_ms) tuples as run().
+        Raises TracerouteError if the session is not open or a send fails.
+        """
+        if self._loop is None or self._send_sock is None:
+            raise TracerouteError("Traceroute session is not open")
+
+        dest_ip = self._lookup_cached(destination)
+        if dest_ip is None:
+            # gethostbyname blocks; keep it off the event loop
+            dest_ip = await self._loop.run_in_executor(
+                None, self._resolve, destination
+            )
+
+        base_port = self._allocate_base_port()
+        window = self._new_window(dest_ip, base_port)
+        window.done = self._loop.create_future()
+        keys = [(dest_ip, base_port + ttl) for ttl in range(1, self.max_ttl + 1)]
+        try:
+            for ttl, key in enumerate(keys, start=1):
+                self._pending[key] = (window, ttl)
+            window.send_times = self._send_probes(
+                self._send_sock, dest_ip, base_port
+            )
+            await asyncio.wait([window.done], timeout=self.timeout)
+        finally:
+            for key in keys:
+                self._pending.pop(key, None)
+
+        return window.hops()
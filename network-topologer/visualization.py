@@ -4,20 +4,42 @@ This module provides visualization capabilities for network traceroute
 topology data using matplotlib for plotting and networkx for graph layout.
 """
 
-from typing import Dict, Set, Optional, Tuple, List
+from typing import Dict, FrozenSet, Set, Optional, Tuple, List
+from collections import OrderedDict
 import warnings
 
 import matplotlib.pyplot as plt
 import networkx as nx
 
+# Maximum number of topology layouts kept by each TopologyVisualizer
+LAYOUT_CACHE_SIZE = 32
+
 class TopologyVisualizer:
     """Visualize network topology from adjacency data.
 
     Uses networkx for graph layout and matplotlib for rendering.
     """
 
+    # Layout engines accepted by plot_topology(); "auto" tries graphviz "dot",
+    # then kamada_kawai, then shell
+    LAYOUT_ENGINES = ("auto", "dot", "kamada_kawai", "spring", "shell")
+
     def __init__(self):
-        pass
+        # (layout_engine, edge set) -> node positions, reused across plots;
+        # least recently used first
+        self._layout_cache: "OrderedDict[Tuple[str, FrozenSet[Tuple[str, str]]], Dict]" = (
+            OrderedDict()
+        )
+
+    def build_graph(self, adjacency: Dict[str, Set[str]]) -> nx.DiGraph:
+        """Build the directed topology graph from an adjacency mapping.
+
+        The result can be passed to plot_topology() and get_graph_stats() so
+        the graph is built only once.
+        """
+        # Bulk-add every edge in one add_edges_from() call rather than one
+        # add_edge() per edge; the sets are iterated as-is, no list copies
+        return nx.from_dict_of_lists(adjacency, create_using=nx.DiGraph)
 
     def plot_topology(
         self,
@@ -28,6 +50,9 @@ class TopologyVisualizer:
         title: str = "Network Topology",
         destination_ips: Optional[Set[str]] = None,
         edge_latencies: Optional[Dict[Tuple[str, str], List[float]]] = None,
+        edge_mean_latencies: Optional[Dict[Tuple[str, str], float]] = None,
+        graph: Optional[nx.DiGraph] = None,
+        layout_engine: str = "auto",
     ) -> None:
         """Plot network topology graph from adjacency mapping.
 
@@ -39,14 +64,16 @@ class TopologyVisualizer:
             title: Plot title
             destination_ips: Set of destination IPs to highlight (colored green)
             edge_latencies: Dict mapping (src_ip, dst_ip) -> list of RTT measurements in ms
+            edge_mean_latencies: Dict mapping (src_ip, dst_ip) -> mean RTT in ms, as
+                built by NetworkTopologer.build_topology_with_mean_latency();
+                used instead of edge_latencies, which then need not be averaged
+            graph: Graph already built from adjacency by build_graph(), if any
+            layout_engine: One of LAYOUT_ENGINES; "spring" is fastest for large graphs
         """
-        # Create directed graph
-        G = nx.DiGraph()
+        if layout_engine not in self.LAYOUT_ENGINES:
+            raise ValueError(f"Unknown layout engine: {layout_engine!r}")
 
-        # Add edges from adjacency data
-        for src, destinations in adjacency.items():
-            for dst in destinations:
-                G.add_edge(src, dst)
+        G = graph if graph is not None else self.build_graph(adjacency)
 
         if len(G.nodes()) == 0:
             warnings.warn("No topology data to visualize (empty graph)")
@@ -55,21 +82,7 @@ class TopologyVisualizer:
         # Create figure
         plt.figure(figsize=figsize)
 
-        # Use hierarchical layout for cleaner visualization with straight lines
-        # Suppress warnings during graphviz import and use
-        import warnings as warn_module
-
-        with warn_module.catch_warnings():
-            warn_module.filterwarnings("ignore")
-            try:
-                pos = nx.nx_agraph.graphviz_layout(G, prog="dot")
-            except (ImportError, AttributeError, Exception):
-                # Fallback to kamada_kawai which produces straighter lines than spring
-                try:
-                    pos = nx.kamada_kawai_layout(G)
-                except Exception:
-                    # Final fallback to shell layout
-                    pos = nx.shell_layout(G)
+        pos = self._layout(G, layout_engine)
 
         # Categorize nodes: destination IPs vs intermediate hops
         all_nodes = set(G.nodes())
@@ -119,12 +132,17 @@ class TopologyVisualizer:
         )
 
         # Draw edge labels with latency information if provided
-        if edge_latencies:
-            edge_labels = {}
-            for (src, dst), latencies in edge_latencies.items():
-                if latencies:
-                    avg_latency = sum(latencies) / len(latencies)
-                    edge_labels[(src, dst)] = f"{avg_latency:.1f}ms"
+        if edge_mean_latencies is None and edge_latencies:
+            edge_mean_latencies = {
+                edge: sum(latencies) / len(latencies)
+                for edge, latencies in edge_latencies.items()
+                if latencies
+            }
+        if edge_mean_latencies:
+            edge_labels = {
+                edge: f"{avg_latency:.1f}ms"
+                for edge, avg_latency in edge_mean_latencies.items()
+            }
 
             nx.draw_networkx_edge_labels(
                 G,
@@ -159,22 +177,68 @@ class TopologyVisualizer:
 
         plt.close()
 
-    def get_graph_stats(self, adjacency: Dict[str, Set[str]]) -> Dict[str, int]:
+    def _layout(self, G: nx.DiGraph, layout_engine: str) -> Dict:
+        """Return node positions for G, computing them only once per edge set."""
+        key = (layout_engine, frozenset(G.edges()))
+        pos = self._layout_cache.get(key)
+        if pos is None:
+            pos = self._layout_cache[key] = self._compute_layout(G, layout_engine)
+            if len(self._layout_cache) > LAYOUT_CACHE_SIZE:
+                self._layout_cache.popitem(last=False)
+        else:
+            self._layout_cache.move_to_end(key)
+        return pos
+
+    def _compute_layout(self, G: nx.DiGraph, layout_engine: str) -> Dict:
+        if layout_engine == "spring":
+            return nx.spring_layout(G, iterations=20)
+        if layout_engine == "shell":
+            return nx.shell_layout(G)
+
+        # Use hierarchical layout for cleaner visualization with straight lines
+        # Suppress warnings during graphviz import and use
+        import warnings as warn_module
+
+        with warn_module.catch_warnings():
+            warn_module.filterwarnings("ignore")
+            if layout_engine in ("auto", "dot"):
+                try:
+                    return nx.nx_agraph.graphviz_layout(G, prog="dot")
+                except (ImportError, AttributeError, Exception):
+                    pass
+            if layout_engine in ("auto", "kamada_kawai"):
+                # Fallback to kamada_kawai which produces straighter lines than spring
+                try:
+                    return nx.kamada_kawai_layout(G)
+                except Exception:
+                    pass
+
+        if layout_engine != "auto":
+            warnings.warn(
+                f"Layout engine {layout_engine!r} unavailable, using shell layout"
+            )
+        # Final fallback to shell layout
+        return nx.shell_layout(G)
+
+    def get_graph_stats(
+        self, adjacency: Dict[str, Set[str]], graph: Optional[nx.DiGraph] = None
+    ) -> Dict[str, int]:
         """Return basic statistics about the topology graph.
 
+        Args:
+            adjacency: Dict mapping IP -> set of next-hop IPs
+            graph: Graph already built from adjacency by build_graph(), if any
+
         Returns:
             Dict with 'nodes', 'edges', 'sources', 'destinations' counts
         """
-        G = nx.DiGraph()
-        for src, destinations in adjacency.items():
-            for dst in destinations:
-                G.add_edge(src, dst)
+        G = graph if graph is not None else self.build_graph(adjacency)
 
         return {
             "nodes": G.number_of_nodes(),
             "edges": G.number_of_edges(),  # type: ignore[misc]
             "sources": len(adjacency),
             "destinations": len(
-                set(dst for dsts in adjacency.values() for dst in dsts)
+                {dst for dsts in adjacency.values() for dst in dsts}
             ),
         }